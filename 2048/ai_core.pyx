@@ -0,0 +1,295 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Compiled expectimax search for the 2048 AI.
+
+This is a C port of the bitboard search in twenty_forty_eight.py: the same
+row tables, move semantics, heuristics and probability pruning, with the
+search itself running without the GIL. Build it in place with:
+
+    cythonize -i ai_core.pyx
+
+When the extension is not built, AIPlayer falls back to the pure-Python search.
+Any change to the Python row tables, heuristic or search must be mirrored
+here; check_ai_core.py verifies that both pick the same moves.
+The transposition table is module-global, so best_move must not be called
+from more than one thread at a time.
+"""
+from libc.stdint cimport uint16_t, uint32_t, uint64_t, int64_t
+from libc.math cimport INFINITY
+
+
+cdef enum:
+    MAX_EXPONENT = 15   # Largest tile exponent a 4-bit nibble can hold
+    MAX_DEPTH = 32
+    TABLE_SIZE = 1 << 20
+
+
+cdef struct Entry:
+    uint64_t bits
+    int64_t score
+    double value
+    int depth
+    uint32_t generation
+
+
+# Row tables: result and score of sliding every possible 16-bit row
+cdef uint16_t LEFT_TABLE[65536]
+cdef uint16_t RIGHT_TABLE[65536]
+cdef uint32_t LEFT_SCORE[65536]
+cdef uint32_t RIGHT_SCORE[65536]
+
+# Bottom-right bias weight of each cell: (column + row) ** 3
+cdef int64_t WEIGHTS[16]
+
+# Zobrist keys per (cell, log2 value) and per search depth
+cdef uint64_t ZOBRIST[16][16]
+cdef uint64_t DEPTH_KEYS[MAX_DEPTH + 1]
+
+# Fixed-size transposition table; entries from older searches are stale
+cdef Entry TRANSPOSITION[TABLE_SIZE]
+cdef uint32_t generation = 0
+
+cdef double prob_threshold = 0.0001
+
+
+cdef inline uint16_t reverse_row(uint16_t row) noexcept nogil:
+    return ((row & 0x000F) << 12) | ((row & 0x00F0) << 4) | ((row & 0x0F00) >> 4) | (row >> 12)
+
+
+cdef uint64_t splitmix64(uint64_t *state) noexcept nogil:
+    state[0] += 0x9E3779B97F4A7C15ULL
+    cdef uint64_t z = state[0]
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL
+    return z ^ (z >> 31)
+
+
+# Keep in sync with _build_row_tables in twenty_forty_eight.py
+cdef void init_tables() noexcept nogil:
+    cdef int row, i, pos, score
+    cdef int line[4]
+    cdef uint16_t result, reversed_row
+    cdef uint64_t seed = 2048
+
+    for row in range(65536):
+        for i in range(4):
+            line[i] = (row >> (4 * i)) & 0xF
+        score = 0
+
+        for i in range(1, 4):
+            pos = i
+            while pos > 0 and line[pos] != 0:
+                if line[pos - 1] == 0:
+                    line[pos - 1] = line[pos]
+                    line[pos] = 0
+                    pos -= 1
+                elif line[pos - 1] == line[pos] and line[pos] < MAX_EXPONENT:
+                    line[pos - 1] += 1
+                    line[pos] = 0
+                    score += 1 << line[pos - 1]
+                    break
+                else:
+                    break
+
+        result = line[0] | (line[1] << 4) | (line[2] << 8) | (line[3] << 12)
+        LEFT_TABLE[row] = result
+        LEFT_SCORE[row] = score
+
+        # Sliding right is sliding the mirrored row left
+        reversed_row = reverse_row(row)
+        RIGHT_TABLE[reversed_row] = reverse_row(result)
+        RIGHT_SCORE[reversed_row] = score
+
+    for i in range(16):
+        WEIGHTS[i] = (i % 4 + i // 4) ** 3
+        for pos in range(16):
+            ZOBRIST[i][pos] = splitmix64(&seed)
+    for i in range(MAX_DEPTH + 1):
+        DEPTH_KEYS[i] = splitmix64(&seed)
+
+
+init_tables()
+
+
+cdef inline uint64_t transpose(uint64_t x) noexcept nogil:
+    cdef uint64_t a1 = x & 0xF0F00F0FF0F00F0FULL
+    cdef uint64_t a2 = x & 0x0000F0F00000F0F0ULL
+    cdef uint64_t a3 = x & 0x0F0F00000F0F0000ULL
+    cdef uint64_t a = a1 | (a2 << 12) | (a3 >> 12)
+    cdef uint64_t b1 = a & 0xFF00FF0000FF00FFULL
+    cdef uint64_t b2 = a & 0x00FF00FF00000000ULL
+    cdef uint64_t b3 = a & 0x00000000FF00FF00ULL
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+cdef inline uint64_t execute_move(uint64_t bits, int direction, int64_t *score) noexcept nogil:
+    """Apply a move (0=w, 1=a, 2=s, 3=d), storing the score gained in score[0]."""
+    cdef bint vertical = direction == 0 or direction == 2
+    cdef const uint16_t *table = &LEFT_TABLE[0]
+    cdef const uint32_t *score_table = &LEFT_SCORE[0]
+    cdef uint64_t result = 0
+    cdef uint16_t row
+    cdef int r
+
+    if direction >= 2:
+        table = &RIGHT_TABLE[0]
+        score_table = &RIGHT_SCORE[0]
+    if vertical:
+        bits = transpose(bits)
+    score[0] = 0
+    for r in range(4):
+        row = (bits >> (16 * r)) & 0xFFFF
+        result |= (<uint64_t>table[row]) << (16 * r)
+        score[0] += score_table[row]
+    if vertical:
+        result = transpose(result)
+    return result
+
+
+cdef inline bint is_game_over(uint64_t bits) noexcept nogil:
+    cdef int64_t score
+
+    # Any empty cell (zero nibble) means a move is possible
+    if (bits - 0x1111111111111111ULL) & ~bits & 0x8888888888888888ULL:
+        return False
+    if execute_move(bits, 1, &score) != bits:
+        return False
+    return execute_move(bits, 0, &score) == bits
+
+
+# Keep in sync with AIPlayer._evaluate_position and AIPlayer._board_stats
+cdef double evaluate(uint64_t bits, int64_t score) noexcept nogil:
+    """Same heuristic as AIPlayer._evaluate_position."""
+    cdef int i, exponent, max_exponent = 0
+    cdef int64_t empty_cells = 0, max_value = 0, bias = 0, variety = 0
+    cdef int counts[16]
+    cdef double s
+
+    if is_game_over(bits):
+        s = <double>score
+        return -(s * s * s * s)  # Heavily penalize game over
+
+    for i in range(16):
+        counts[i] = 0
+    for i in range(16):
+        exponent = (bits >> (4 * i)) & 0xF
+        counts[exponent] += 1
+        if exponent:
+            bias += WEIGHTS[i] << exponent
+            if exponent > max_exponent:
+                max_exponent = exponent
+    empty_cells = counts[0]
+    if max_exponent:
+        max_value = (<int64_t>1) << max_exponent
+    for exponent in range(1, 16):
+        variety += (max_value >> exponent) * counts[exponent]
+
+    return <double>(
+        empty_cells * empty_cells * max_value * 1024 +
+        bias * 4 +
+        max_value * score +
+        variety
+    )
+
+
+cdef inline Entry *table_slot(uint64_t bits, int depth, int64_t score) noexcept nogil:
+    cdef uint64_t h = DEPTH_KEYS[depth] ^ (<uint64_t>score * 0x9E3779B97F4A7C15ULL)
+    cdef int i
+    for i in range(16):
+        h ^= ZOBRIST[i][(bits >> (4 * i)) & 0xF]
+    return &TRANSPOSITION[h & (TABLE_SIZE - 1)]
+
+
+# Keep in sync with AIPlayer._expectimax_max and AIPlayer._expectimax_chance
+cdef double expectimax_max(uint64_t bits, int depth, double prob, int64_t score) noexcept nogil:
+    cdef int direction
+    cdef uint64_t new_bits
+    cdef int64_t move_score = 0
+    cdef double value, best_value = 0
+    cdef bint found = False
+
+    for direction in range(4):
+        new_bits = execute_move(bits, direction, &move_score)
+        if new_bits == bits:
+            continue
+        value = expectimax_chance(new_bits, depth - 1, prob, score + move_score)
+        if not found or value > best_value:
+            best_value = value
+            found = True
+
+    # No legal moves: score the dead position directly
+    if not found:
+        return evaluate(bits, score)
+    return best_value
+
+
+cdef double expectimax_chance(uint64_t bits, int depth, double prob, int64_t score) noexcept nogil:
+    cdef Entry *slot
+    cdef int i, empty_cells = 0
+    cdef uint64_t tile
+    cdef double prob_two, prob_four, value = 0
+
+    # Stop at the depth limit or when this branch is too unlikely to matter
+    if depth <= 0 or prob < prob_threshold:
+        return evaluate(bits, score)
+
+    slot = table_slot(bits, depth, score)
+    if (slot.generation == generation and slot.bits == bits and
+            slot.depth == depth and slot.score == score):
+        return slot.value
+
+    for i in range(16):
+        if ((bits >> (4 * i)) & 0xF) == 0:
+            empty_cells += 1
+    if empty_cells == 0:
+        return evaluate(bits, score)
+
+    # 90% chance for 2, 10% chance for 4, spread evenly across empty cells
+    prob_two = 0.9 / empty_cells
+    prob_four = 0.1 / empty_cells
+
+    for i in range(16):
+        if ((bits >> (4 * i)) & 0xF) == 0:
+            tile = (<uint64_t>1) << (4 * i)
+            value += prob_two * expectimax_max(bits | tile, depth, prob * prob_two, score)
+            value += prob_four * expectimax_max(bits | (tile << 1), depth, prob * prob_four, score)
+
+    # Keep the deeper (more expensive) result when two positions collide
+    if slot.generation != generation or slot.depth <= depth:
+        slot.bits = bits
+        slot.score = score
+        slot.depth = depth
+        slot.value = value
+        slot.generation = generation
+    return value
+
+
+def best_move(uint64_t bits, int64_t score, int depth, double threshold):
+    """
+    Get the best move for a bitboard using expectimax.
+    Returns (move, expected_value), matching AIPlayer._get_best_move.
+    """
+    global generation, prob_threshold
+    cdef int direction, best_direction = 0
+    cdef uint64_t new_bits
+    cdef int64_t move_score = 0
+    cdef double value, best_value = -INFINITY
+
+    if depth < 1 or depth > MAX_DEPTH:
+        raise ValueError(f"depth must be between 1 and {MAX_DEPTH}")
+
+    # Cached values are only reused within a single decision
+    generation += 1
+    prob_threshold = threshold
+
+    with nogil:
+        for direction in range(4):
+            new_bits = execute_move(bits, direction, &move_score)
+            if new_bits == bits:
+                continue  # Skip invalid moves
+            value = expectimax_chance(new_bits, depth - 1, 1.0, score + move_score)
+            if value > best_value:
+                best_value = value
+                best_direction = direction
+
+    return 'wasd'[best_direction], best_value
@@ -0,0 +1,54 @@
+"""
+Check that the compiled ai_core kernel plays exactly like the pure-Python AI.
+
+ai_core.pyx duplicates the row tables, move rules, heuristic and pruning of
+twenty_forty_eight.py, so any change to one must be mirrored in the other.
+Build the extension (cythonize -i ai_core.pyx) and run this script from this
+directory; it is skipped when the extension is not built.
+"""
+import random
+import sys
+
+import twenty_forty_eight as game
+
+
+BOARD_COUNT = 300
+SEED = 2048
+
+
+def main() -> int:
+    """Compare both searches on seeded random boards. Returns the exit code."""
+    ai_core = game.ai_core
+    if ai_core is None:
+        print("ai_core is not built; skipping parity check")
+        return 0
+
+    # Force AIPlayer onto the pure-Python search
+    game.ai_core = None
+
+    rng = random.Random(SEED)
+    config = game.GameConfig()
+    player = game.AIPlayer(None)
+    board = game.GameBoard(config.BOARD_SIZE)
+    mismatches = 0
+
+    for _ in range(BOARD_COUNT):
+        board.bits = sum(rng.choice([0, 0, 1, 2, 3, 4, 5, 6, 7]) << (4 * i) for i in range(16))
+        score = rng.randrange(5000)
+
+        player._transposition.clear()
+        python_move, python_value = player._get_best_move(board, score)
+        compiled_move, compiled_value = ai_core.best_move(
+            board.bits, score, config.AI_LOOKUP_DISTANCE, config.AI_PROBABILITY_THRESHOLD)
+
+        if python_move != compiled_move or abs(python_value - compiled_value) > 1e-9 * max(1.0, abs(python_value)):
+            mismatches += 1
+            print(f"{board.bits:#018x} score={score}: python {python_move} {python_value}, "
+                  f"compiled {compiled_move} {compiled_value}")
+
+    print(f"{mismatches} mismatches on {BOARD_COUNT} boards")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
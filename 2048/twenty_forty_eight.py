@@ -2,10 +2,19 @@ import random
 import pygame
 import os
 import copy
+import queue
+import threading
+import time
+from array import array
 from typing import List, Tuple, Optional, Dict, Any
 from enum import Enum
 from dataclasses import dataclass
 
+try:
+    import ai_core  # Optional compiled search kernel, built from ai_core.pyx
+except ImportError:
+    ai_core = None
+
 
 class GameState(Enum):
     """Represents the current state of the game."""
@@ -30,8 +39,12 @@ class GameConfig:
     # Game settings
     BOARD_SIZE: int = 4
     MAX_HISTORY: int = 5
-    AI_LOOKUP_DISTANCE: int = 5
-    AI_LOOKUP_LIMIT: int = 200
+    AI_LOOKUP_DISTANCE: int = 3
+    AI_COMPILED_LOOKUP_DISTANCE: int = 5
+    AI_LOOKUP_LIMIT: int = 200  # Node budget for the survival search
+    AI_SURVIVAL_DEPTH: int = 20
+    AI_PROBABILITY_THRESHOLD: float = 0.0001
+    AI_TICK_BUDGET: float = 0.010  # Seconds of AI moves per frame
     
     # File paths
     BEST_SCORE_FILE: str = 'best_score.txt'
@@ -47,151 +60,249 @@ class Colors:
     SCORE_BG: Tuple[int, int, int] = (187, 174, 158)
     TITLE: Tuple[int, int, int] = (125, 115, 103)
     BUTTON: Tuple[int, int, int] = (255, 120, 13)
+
+
+# Tile colors indexed by log2 of the tile value (index 0 is an empty cell)
+TILE_COLORS: Tuple[Tuple[int, int, int], ...] = (
+    (204, 193, 181), (238, 229, 219), (237, 225, 202), (240, 178, 127),  # 0, 2, 4, 8
+    (247, 151, 91), (248, 124, 98), (246, 94, 57), (237, 206, 115),      # 16, 32, 64, 128
+    (237, 202, 100), (237, 198, 81), (238, 199, 68), (236, 194, 48),     # 256, 512, 1024, 2048
+    (254, 61, 62), (255, 32, 33), (255, 32, 33), (255, 32, 33),          # 4096, 8192, 16384, 32768
+)
+
+# Text colors indexed by log2 of the tile value (index 0 is an empty cell)
+TEXT_COLORS: Tuple[Tuple[int, int, int], ...] = (
+    (0, 0, 0), (119, 110, 102), (119, 110, 102), (255, 255, 255),        # 0, 2, 4, 8
+    (255, 255, 255), (255, 255, 255), (255, 255, 255), (255, 255, 255),  # 16, 32, 64, 128
+    (255, 255, 255), (255, 255, 255), (255, 255, 255), (255, 255, 255),  # 256, 512, 1024, 2048
+    (255, 255, 255), (255, 32, 33), (255, 255, 255), (255, 255, 255),    # 4096, 8192, 16384, 32768
+)
+
+
+# Largest tile exponent a 4-bit bitboard nibble can hold (2 ** 15 = 32768)
+MAX_EXPONENT = 15
+
+
+def _reverse_row(row: int) -> int:
+    """Reverse the order of the four nibbles in a 16-bit row."""
+    return ((row & 0x000F) << 12) | ((row & 0x00F0) << 4) | ((row & 0x0F00) >> 4) | (row >> 12)
+
+
+# Keep in sync with init_tables in ai_core.pyx (verify with check_ai_core.py)
+def _build_row_tables() -> Tuple[array, array, array, array]:
+    """
+    Precompute the result and score of sliding every possible 16-bit row.
+    Rows are slid with the original algorithm, so chained merges behave
+    exactly as they did when moves were processed cell by cell.
+    Returns (left_table, left_score, right_table, right_score).
+    """
+    left_table = array('I', [0]) * 65536
+    left_score = array('I', [0]) * 65536
+    right_table = array('I', [0]) * 65536
+    right_score = array('I', [0]) * 65536
+    
+    for row in range(65536):
+        line = [(row >> (4 * i)) & 0xF for i in range(4)]
+        score = 0
+        
+        for i in range(1, 4):
+            pos = i
+            while pos > 0 and line[pos] != 0:
+                if line[pos - 1] == 0:
+                    # Move tile to empty position
+                    line[pos - 1] = line[pos]
+                    line[pos] = 0
+                    pos -= 1
+                elif line[pos - 1] == line[pos] and line[pos] < MAX_EXPONENT:
+                    # Merge tiles
+                    line[pos - 1] += 1
+                    line[pos] = 0
+                    score += 1 << line[pos - 1]
+                    break
+                else:
+                    break
+        
+        result = line[0] | (line[1] << 4) | (line[2] << 8) | (line[3] << 12)
+        left_table[row] = result
+        left_score[row] = score
+        
+        # Sliding right is sliding the mirrored row left
+        reversed_row = _reverse_row(row)
+        right_table[reversed_row] = _reverse_row(result)
+        right_score[reversed_row] = score
+    
+    return left_table, left_score, right_table, right_score
+
+
+_LEFT_TABLE, _LEFT_SCORE, _RIGHT_TABLE, _RIGHT_SCORE = _build_row_tables()
+
+
+def _transpose(bits: int) -> int:
+    """Transpose the 4x4 bitboard so columns become rows."""
+    a1 = bits & 0xF0F00F0FF0F00F0F
+    a2 = bits & 0x0000F0F00000F0F0
+    a3 = bits & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _slide_rows(bits: int, table: array, score_table: array) -> Tuple[int, int]:
+    """Slide all four rows through a row table. Returns (new_bits, score)."""
+    row0 = bits & 0xFFFF
+    row1 = (bits >> 16) & 0xFFFF
+    row2 = (bits >> 32) & 0xFFFF
+    row3 = bits >> 48
+    new_bits = table[row0] | (table[row1] << 16) | (table[row2] << 32) | (table[row3] << 48)
+    score = score_table[row0] + score_table[row1] + score_table[row2] + score_table[row3]
+    return new_bits, score
+
+
+def _move_left(bits: int) -> Tuple[int, int]:
+    """Slide the board left. Returns (new_bits, score)."""
+    return _slide_rows(bits, _LEFT_TABLE, _LEFT_SCORE)
+
+
+def _move_right(bits: int) -> Tuple[int, int]:
+    """Slide the board right. Returns (new_bits, score)."""
+    return _slide_rows(bits, _RIGHT_TABLE, _RIGHT_SCORE)
+
+
+def _move_up(bits: int) -> Tuple[int, int]:
+    """Slide the board up. Returns (new_bits, score)."""
+    new_bits, score = _slide_rows(_transpose(bits), _LEFT_TABLE, _LEFT_SCORE)
+    return _transpose(new_bits), score
+
+
+def _move_down(bits: int) -> Tuple[int, int]:
+    """Slide the board down. Returns (new_bits, score)."""
+    new_bits, score = _slide_rows(_transpose(bits), _RIGHT_TABLE, _RIGHT_SCORE)
+    return _transpose(new_bits), score
+
+
+_MOVES = {'w': _move_up, 'a': _move_left, 's': _move_down, 'd': _move_right}
+
+
+def simulate_move(bits: int, direction: str) -> Tuple[int, int, bool]:
+    """
+    Apply a move to a bitboard without allocating any game objects.
+    Returns (new_bits, score_gained, moved).
+    """
+    new_bits, score = _MOVES[direction](bits)
+    return new_bits, score, new_bits != bits
+
+
+def is_game_over_bits(bits: int) -> bool:
+    """Check if no moves are possible on a bitboard."""
+    # Any empty cell (zero nibble) means a move is possible
+    if (bits - 0x1111111111111111) & ~bits & 0x8888888888888888:
+        return False
     
-    # Tile colors for different values
-    TILE_COLORS: Dict[int, Tuple[int, int, int]] = None
-    
-    # Text colors for different values
-    TEXT_COLORS: Dict[int, Tuple[int, int, int]] = None
-    
-    def __post_init__(self):
-        if self.TILE_COLORS is None:
-            self.TILE_COLORS = {
-                0: (204, 193, 181), 2: (238, 229, 219), 4: (237, 225, 202),
-                8: (240, 178, 127), 16: (247, 151, 91), 32: (248, 124, 98),
-                64: (246, 94, 57), 128: (237, 206, 115), 256: (237, 202, 100),
-                512: (237, 198, 81), 1024: (238, 199, 68), 2048: (236, 194, 48),
-                4096: (254, 61, 62), 8192: (255, 32, 33), 16384: (255, 32, 33),
-                32768: (255, 32, 33), 65536: (255, 32, 33)
-            }
-        
-        if self.TEXT_COLORS is None:
-            self.TEXT_COLORS = {
-                0: (0, 0, 0), 2: (119, 110, 102), 4: (119, 110, 102),
-                8: (255, 255, 255), 16: (255, 255, 255), 32: (255, 255, 255),
-                64: (255, 255, 255), 128: (255, 255, 255), 256: (255, 255, 255),
-                512: (255, 255, 255), 1024: (255, 255, 255), 2048: (255, 255, 255),
-                4096: (255, 255, 255), 8192: (255, 32, 33), 16384: (255, 255, 255),
-                32768: (255, 255, 255), 65536: (255, 255, 255)
-            }
+    # On a full board a line slides one way exactly when it slides the other,
+    # so only left and up need to be tried
+    if _slide_rows(bits, _LEFT_TABLE, _LEFT_SCORE)[0] != bits:
+        return False
+    transposed = _transpose(bits)
+    return _slide_rows(transposed, _LEFT_TABLE, _LEFT_SCORE)[0] == transposed
+
+
+def max_tile_value(bits: int) -> int:
+    """Get the maximum tile value on a bitboard."""
+    max_exponent = max((bits >> (4 * i)) & 0xF for i in range(16))
+    return 1 << max_exponent if max_exponent else 0
+
+
+def count_empty_cells(bits: int) -> int:
+    """Get the number of empty cells on a bitboard."""
+    return sum(not (bits >> (4 * i)) & 0xF for i in range(16))
 
 
 class GameBoard:
-    """Handles the game board logic and operations."""
+    """
+    Handles the game board logic and operations.
+
+    The board is packed into a single integer bitboard: cell i holds the log2
+    of its tile value in the 4-bit nibble at bits 4*i..4*i+3, with 0 meaning
+    an empty cell. Row r occupies bits 16*r..16*r+15 with its leftmost cell in
+    the lowest nibble. Copying the board is therefore a plain integer assignment.
+    """
     
     def __init__(self, size: int = 4):
+        if size != 4:
+            raise ValueError("The bitboard only supports a 4x4 board")
         self.size = size
         self.total_cells = size * size
-        self.board = [0] * self.total_cells
+        self.bits = 0
+        self._rng = random.Random()  # Seeded from os.urandom
         self._initialize_board()
     
     def _initialize_board(self) -> None:
         """Initialize the board with two random tiles."""
-        self.board = [0] * self.total_cells
+        self.bits = 0
         self._add_random_tile()
         self._add_random_tile()
     
     def _add_random_tile(self) -> bool:
         """Add a random tile (2 or 4) to an empty cell."""
-        empty_cells = [i for i in range(self.total_cells) if self.board[i] == 0]
-        if not empty_cells:
+        bits = self.bits
+        empty_count = count_empty_cells(bits)
+        if not empty_count:
             return False
         
-        position = random.choice(empty_cells)
+        # Scan the nibbles for the k-th empty cell
+        k = self._rng.randrange(empty_count)
+        position = 0
+        while True:
+            if not (bits >> (4 * position)) & 0xF:
+                if k == 0:
+                    break
+                k -= 1
+            position += 1
+        
         # 90% chance for 2, 10% chance for 4
-        self.board[position] = 2 if random.random() < 0.9 else 4
+        self.bits = bits | ((1 if self._rng.random() < 0.9 else 2) << (4 * position))
         return True
     
+    def get_exponent(self, index: int) -> int:
+        """Get the log2 of the tile at the given cell (0 for an empty cell)."""
+        return (self.bits >> (4 * index)) & 0xF
+    
     def is_game_over(self) -> bool:
         """Check if the game is over (no moves possible)."""
-        # Check for empty cells
-        if 0 in self.board:
-            return False
-        
-        # Check for possible merges
-        for i in range(self.total_cells):
-            value = self.board[i]
-            # Check right neighbor
-            if i % self.size < self.size - 1 and self.board[i + 1] == value:
-                return False
-            # Check bottom neighbor
-            if i // self.size < self.size - 1 and self.board[i + self.size] == value:
-                return False
-        
-        return True
+        return is_game_over_bits(self.bits)
     
     def get_max_value(self) -> int:
         """Get the maximum value on the board."""
-        return max(self.board) if self.board else 0
+        return max_tile_value(self.bits)
     
     def get_empty_cell_count(self) -> int:
         """Get the number of empty cells."""
-        return self.board.count(0)
+        return count_empty_cells(self.bits)
     
     def copy(self) -> 'GameBoard':
-        """Create a deep copy of the board."""
+        """Create a copy of the board."""
         new_board = GameBoard(self.size)
-        new_board.board = self.board.copy()
+        new_board.bits = self.bits
         return new_board
 
 
-class MoveDirection:
-    """Handles movement directions using the original indexing system."""
-    
-    def __init__(self, size: int = 4):
-        self.size = size
-        self.total_cells = size * size
-        self._initialize_directions()
-    
-    def _initialize_directions(self) -> None:
-        """Initialize direction mappings exactly like the original."""
-        # Up: process columns from top to bottom
-        self.up = list(range(self.total_cells))
-        
-        # Down: process columns from bottom to top
-        self.down = list(range(self.total_cells - 1, -1, -1))
-        
-        # Left: process rows from left to right
-        self.left = []
-        for i in range(self.size):
-            self.left.extend(range(i, self.total_cells, self.size))
-        
-        # Right: process rows from right to left
-        self.right = []
-        for i in range(self.size - 1, -1, -1):
-            self.right.extend(range(i, self.total_cells, self.size))
-        
-        self.directions = {
-            'w': self.up, 'a': self.left,
-            's': self.down, 'd': self.right
-        }
-    
-    def get_direction_indices(self, direction: str) -> List[int]:
-        """Get the indices for processing a specific direction."""
-        return self.directions.get(direction, [])
-
-
 class GameLogic:
-    """Handles the core game logic and move processing using original algorithm."""
+    """Handles the core game logic and move processing on the bitboard."""
     
-    def __init__(self, board: GameBoard, move_direction: MoveDirection):
+    def __init__(self, board: GameBoard):
         self.board = board
-        self.move_direction = move_direction
     
     def make_move(self, direction: str) -> Tuple[int, bool]:
         """
-        Make a move in the specified direction using the original algorithm.
+        Make a move in the specified direction ('w', 'a', 's' or 'd').
         Returns (score_gained, move_made).
         """
-        if direction not in self.move_direction.directions:
+        if direction not in _MOVES:
             return 0, False
         
-        # Create a copy to test the move
-        original_board = self.board.board.copy()
-        score = self._process_move(direction)
-        
-        # Check if the move actually changed anything
-        move_made = self.board.board != original_board
+        score, move_made = self._process_move(direction)
         
         # Add new tile if move was made
         if move_made:
@@ -199,40 +310,13 @@ class GameLogic:
         
         return score, move_made
     
-    def _process_move(self, direction: str) -> int:
-        """Process the actual move using the original algorithm."""
-        move_indices = self.move_direction.get_direction_indices(direction)
-        score = 0
-        add_point = False
-        
-        # Process each position in the move order
-        for i in range(self.board.total_cells):
-            pos = move_indices[i]
-            if self.board.board[pos] == 0:
-                continue
-            
-            # Look backward in the processing order
-            next_i = i - self.board.size
-            while next_i >= 0:
-                next_pos = move_indices[next_i]
-                if self.board.board[next_pos] == 0:
-                    # Move tile to empty position
-                    self.board.board[next_pos] = self.board.board[pos]
-                    self.board.board[pos] = 0
-                    pos = next_pos
-                    next_i -= self.board.size
-                    add_point = True
-                elif self.board.board[pos] == self.board.board[next_pos]:
-                    # Merge tiles
-                    self.board.board[next_pos] = 2 * self.board.board[next_pos]
-                    self.board.board[pos] = 0
-                    add_point = True
-                    score += self.board.board[next_pos]
-                    break
-                else:
-                    break
-        
-        return score
+    def _process_move(self, direction: str) -> Tuple[int, bool]:
+        """
+        Process the actual move using the precomputed row tables.
+        Returns (score_gained, move_made).
+        """
+        self.board.bits, score, move_made = simulate_move(self.board.bits, direction)
+        return score, move_made
 
 
 class Player:
@@ -280,14 +364,28 @@ class AIPlayer(Player):
         self.game_logic = game_logic
         self.config = GameConfig()
         self.stuck_counter = 0
+        
+        # Transposition table mapping (bits, depth, score) -> chance node value;
+        # the bitboard int is itself an exact key, so no hashing scheme is needed
+        self._transposition: Dict[Tuple[int, int, int], float] = {}
+        
+        # Bottom-right bias weight of each cell (bottom-right gets higher weights)
+        self._br_weights = tuple((i % 4 + i // 4) ** 3 for i in range(16))
+        
+        # Nodes visited by the current survival search
+        self._survival_nodes = 0
     
     def get_move(self, board: GameBoard, score: int) -> str:
-        """Get the best move using minimax with heuristics."""
-        # If stuck too long, make random moves
-        if self.stuck_counter > 15:
+        """Get the best move using expectimax with heuristics."""
+        # Cached values are only reused within a single decision
+        self._transposition.clear()
+        
+        # If stuck, look for a line that avoids game over instead
+        if self.stuck_counter > 3:
+            survival_move = self._survival_search(board.bits, score, self.config.AI_SURVIVAL_DEPTH)
+            if survival_move is not None:
+                return survival_move
             return random.choice(['w', 'a', 's', 'd'])
-        elif self.stuck_counter > 5:
-            return random.choice(['a', 's', 'd'])  # Avoid 'w' which might be causing the issue
         
         try:
             best_move, _ = self._get_best_move(board, score)
@@ -295,42 +393,178 @@ class AIPlayer(Player):
         except Exception:
             return random.choice(['w', 'a', 's', 'd'])
     
-    def _get_best_move(self, board: GameBoard, score: int) -> Tuple[str, int]:
-        """Get the best move using minimax with heuristics."""
+    def _get_best_move(self, board: GameBoard, score: int) -> Tuple[str, float]:
+        """Get the best move using a fixed-depth expectimax search."""
+        # Use the compiled kernel when available; it can afford a deeper search
+        if ai_core is not None:
+            return ai_core.best_move(board.bits, score,
+                                     self.config.AI_COMPILED_LOOKUP_DISTANCE,
+                                     self.config.AI_PROBABILITY_THRESHOLD)
+        
         best_score = float('-inf')
         best_move = 'w'
         
         for direction in ['w', 'a', 's', 'd']:
-            # Create a copy for evaluation
-            test_board = board.copy()
-            test_logic = GameLogic(test_board, self.game_logic.move_direction)
-            
-            # Make the move
-            move_score, move_made = test_logic.make_move(direction)
+            # Simulate the move directly on the bitboard
+            new_bits, move_score, move_made = simulate_move(board.bits, direction)
             
             if not move_made:
                 continue  # Skip invalid moves
             
-            # Evaluate this position
+            # Average over the tiles that can spawn after this move
             total_score = score + move_score
-            heuristic_value = self._evaluate_position(test_board, total_score)
+            expected_value = self._expectimax_chance(
+                new_bits, self.config.AI_LOOKUP_DISTANCE - 1, 1.0, total_score)
             
-            if heuristic_value > best_score:
-                best_score = heuristic_value
+            if expected_value > best_score:
+                best_score = expected_value
                 best_move = direction
         
         return best_move, best_score
     
-    def _evaluate_position(self, board: GameBoard, score: int) -> float:
-        """Evaluate a board position using heuristics."""
-        if board.is_game_over():
+    # The search and heuristic below are mirrored in ai_core.pyx; keep both in
+    # sync and verify with check_ai_core.py
+    def _expectimax_max(self, bits: int, depth: int, prob: float, score: int) -> float:
+        """Value of a player node: the best expected value over all legal moves."""
+        best_value = None
+        
+        for direction in ['w', 'a', 's', 'd']:
+            new_bits, move_score, move_made = simulate_move(bits, direction)
+            if not move_made:
+                continue
+            
+            value = self._expectimax_chance(new_bits, depth - 1, prob, score + move_score)
+            if best_value is None or value > best_value:
+                best_value = value
+        
+        # No legal moves: score the dead position directly
+        if best_value is None:
+            return self._evaluate_position(bits, score)
+        return best_value
+    
+    def _expectimax_chance(self, bits: int, depth: int, prob: float, score: int) -> float:
+        """Value of a chance node: the expected value over every possible tile spawn."""
+        # Stop at the depth limit or when this branch is too unlikely to matter
+        if depth <= 0 or prob < self.config.AI_PROBABILITY_THRESHOLD:
+            return self._evaluate_position(bits, score)
+        
+        key = (bits, depth, score)
+        value = self._transposition.get(key)
+        if value is not None:
+            return value
+        
+        empty_cells = [i for i in range(16) if not (bits >> (4 * i)) & 0xF]
+        if not empty_cells:
+            return self._evaluate_position(bits, score)
+        
+        # 90% chance for 2, 10% chance for 4, spread evenly across empty cells
+        prob_two = 0.9 / len(empty_cells)
+        prob_four = 0.1 / len(empty_cells)
+        
+        value = 0.0
+        for i in empty_cells:
+            value += prob_two * self._expectimax_max(bits | (1 << (4 * i)), depth, prob * prob_two, score)
+            value += prob_four * self._expectimax_max(bits | (2 << (4 * i)), depth, prob * prob_four, score)
+        
+        self._transposition[key] = value
+        return value
+    
+    def _survival_search(self, bits: int, score: int, depth: int) -> Optional[str]:
+        """
+        Narrow deterministic lookahead used when the AI is stuck.
+        Every spawn is assumed to be a 2 in the cell that is worst for the
+        evaluator, so the tree only branches on moves. The search deepens one
+        move at a time so every legal move is compared at the same horizon.
+        Returns the first move of the longest line that avoids game over,
+        breaking ties by the evaluator, or None if no move is legal.
+        """
+        self._survival_nodes = 0
+        memo: Dict[int, Tuple[int, int]] = {}
+        
+        # (direction, board after the worst spawn, value of that board)
+        candidates = []
+        for direction in ['w', 'a', 's', 'd']:
+            new_bits, move_score, move_made = simulate_move(bits, direction)
+            if not move_made:
+                continue
+            spawned = self._worst_spawn(new_bits, score)
+            candidates.append((direction, spawned, self._evaluate_position(spawned, score + move_score)))
+        
+        if not candidates:
+            return None
+        
+        lengths = [1] * len(candidates)
+        for horizon in range(1, depth):
+            results = [self._survival_length(spawned, score, horizon, memo) for _, spawned, _ in candidates]
+            if None in results:
+                break  # Node budget spent; keep the last complete horizon
+            
+            lengths = [1 + length for length in results]
+            if max(lengths) <= horizon:
+                break  # Every line dies inside the horizon, so the lengths are exact
+        
+        best_index = max(range(len(candidates)), key=lambda i: (lengths[i], candidates[i][2]))
+        return candidates[best_index][0]
+    
+    def _survival_length(self, bits: int, score: int, depth: int,
+                         memo: Dict[int, Tuple[int, int]]) -> Optional[int]:
+        """
+        Number of moves (up to depth) a position survives against worst-case 2 spawns,
+        or None if the node budget runs out first.
+        """
+        if depth <= 0:
+            return 0
+        
+        # memo maps bits -> (length, horizon searched); a line that died
+        # inside its horizon has an exact length at any depth
+        if bits in memo:
+            length, horizon = memo[bits]
+            if length < horizon or depth <= horizon:
+                return min(length, depth)
+        
+        if self._survival_nodes >= self.config.AI_LOOKUP_LIMIT:
+            return None
+        self._survival_nodes += 1
+        
+        best_length = 0
+        for direction in ['w', 'a', 's', 'd']:
+            new_bits, _, move_made = simulate_move(bits, direction)
+            if not move_made:
+                continue
+            
+            length = self._survival_length(self._worst_spawn(new_bits, score), score, depth - 1, memo)
+            if length is None:
+                return None
+            best_length = max(best_length, 1 + length)
+            if best_length >= depth:
+                break  # Survives the whole horizon
+        
+        memo[bits] = (best_length, depth)
+        return best_length
+    
+    def _worst_spawn(self, bits: int, score: int) -> int:
+        """Place a 2 in the empty cell that minimizes the evaluator."""
+        worst_bits = bits
+        worst_value = None
+        
+        for i in range(16):
+            if (bits >> (4 * i)) & 0xF:
+                continue
+            candidate = bits | (1 << (4 * i))
+            value = self._evaluate_position(candidate, score)
+            if worst_value is None or value < worst_value:
+                worst_value = value
+                worst_bits = candidate
+        
+        return worst_bits
+    
+    def _evaluate_position(self, bits: int, score: int) -> float:
+        """Evaluate a bitboard position using heuristics."""
+        if is_game_over_bits(bits):
             return -1 * (score ** 4)  # Heavily penalize game over
         
         # Calculate various heuristics
-        empty_cells = board.get_empty_cell_count()
-        max_value = board.get_max_value()
-        bottom_right_bias = self._calculate_bottom_right_bias(board)
-        variety_score = self._calculate_variety_score(board, max_value)
+        empty_cells, max_value, bottom_right_bias, variety_score = self._board_stats(bits)
         
         # Weighted combination of heuristics (based on original)
         evaluation = (
@@ -342,62 +576,72 @@ class AIPlayer(Player):
         
         return evaluation
     
-    def _calculate_bottom_right_bias(self, board: GameBoard) -> float:
-        """Calculate bottom-right bias (prefer higher values in bottom-right)."""
-        total = 0
-        for i in range(board.total_cells):
-            # Weight by position (bottom-right gets higher weights)
-            weight = (i % board.size + i // board.size) ** 3
-            total += weight * board.board[i]
-        return total
-    
-    def _calculate_variety_score(self, board: GameBoard, max_value: int) -> float:
-        """Calculate variety score (prefer diverse tile values)."""
-        variety = {}
-        for value in board.board:
-            variety[value] = variety.get(value, 0) + 1
+    def _board_stats(self, bits: int) -> Tuple[int, int, int, int]:
+        """
+        Compute all evaluation statistics in a single pass over the cells.
+        Returns (empty_cells, max_value, bottom_right_bias, variety_score).
+        """
+        max_exponent = 0
+        bottom_right_bias = 0
+        counts = [0] * 16  # Number of tiles per log2 value
+        
+        for i, weight in enumerate(self._br_weights):
+            exponent = (bits >> (4 * i)) & 0xF
+            counts[exponent] += 1
+            if exponent:
+                bottom_right_bias += weight << exponent
+                if exponent > max_exponent:
+                    max_exponent = exponent
+        
+        max_value = 1 << max_exponent if max_exponent else 0
         
+        # Variety score (prefer diverse tile values)
         variety_score = 0
-        for value, count in variety.items():
-            if value != 0:
-                variety_score += (max_value // value) * count
+        for exponent in range(1, max_exponent + 1):
+            variety_score += (max_value >> exponent) * counts[exponent]
         
-        return variety_score
+        return counts[0], max_value, bottom_right_bias, variety_score
 
 
 class GameHistory:
-    """Manages game history for undo functionality."""
+    """Manages game history for undo functionality, as a ring buffer of bitboards."""
     
     def __init__(self, max_history: int = 5):
         self.max_history = max_history
-        self.board_history: List[List[int]] = []
-        self.score_history: List[int] = []
+        self._capacity = max_history + 1
+        self._boards: List[int] = [0] * self._capacity
+        self._scores: List[int] = [0] * self._capacity
+        self._head = 0  # Slot the next state is written to
+        self._len = 0
     
-    def add_state(self, board: List[int], score: int) -> None:
-        """Add a game state to history."""
+    def add_state(self, board: int, score: int) -> None:
+        """Add a game state (a bitboard) to history."""
         # Only add if different from last state
-        if not self.board_history or self.board_history[-1] != board:
-            self.board_history.append(board.copy())
-            self.score_history.append(score)
-            
-            # Limit history size
-            if len(self.board_history) > self.max_history + 1:
-                self.board_history.pop(0)
-                self.score_history.pop(0)
+        if self._len and self._boards[self._head - 1] == board:
+            return
+        
+        self._boards[self._head] = board
+        self._scores[self._head] = score
+        self._head = (self._head + 1) % self._capacity
+        
+        # Once full, the oldest state is overwritten
+        if self._len < self._capacity:
+            self._len += 1
     
     def can_undo(self) -> bool:
         """Check if undo is possible."""
-        return len(self.board_history) > 1
+        return self._len > 1
     
-    def undo(self) -> Tuple[List[int], int]:
+    def undo(self) -> Tuple[int, int]:
         """Undo the last move."""
         if not self.can_undo():
             raise ValueError("Cannot undo: insufficient history")
         
-        self.board_history.pop(-1)
-        self.score_history.pop(-1)
+        # Drop the current state and pop the one before it
+        self._head = (self._head - 2) % self._capacity
+        self._len -= 2
         
-        return self.board_history.pop(-1), self.score_history.pop(-1)
+        return self._boards[self._head], self._scores[self._head]
 
 
 class Game2048:
@@ -409,8 +653,7 @@ class Game2048:
         
         # Initialize game components
         self.board = GameBoard(self.config.BOARD_SIZE)
-        self.move_direction = MoveDirection(self.config.BOARD_SIZE)
-        self.game_logic = GameLogic(self.board, self.move_direction)
+        self.game_logic = GameLogic(self.board)
         self.history = GameHistory(self.config.MAX_HISTORY)
         
         # Initialize players
@@ -423,6 +666,15 @@ class Game2048:
         self.score = 0
         self.best_score = self._load_best_score()
         
+        # Whether the screen needs to be redrawn on the next frame
+        self._dirty = True
+        
+        # Background AI search: jobs are (bits, score), results are (bits, move)
+        self._search_queue: queue.Queue = queue.Queue()
+        self._result_queue: queue.Queue = queue.Queue()
+        self._search_pending = False
+        threading.Thread(target=self._ai_worker, daemon=True).start()
+        
         # Initialize pygame
         self._initialize_pygame()
     
@@ -441,6 +693,9 @@ class Game2048:
         
         # Initialize fonts
         self._initialize_fonts()
+        
+        # Pre-render static screen elements
+        self._initialize_surfaces()
     
     def _initialize_fonts(self) -> None:
         """Initialize pygame fonts."""
@@ -454,6 +709,12 @@ class Game2048:
             'score_value': pygame.font.Font(font_path, 20),
             'final_score': pygame.font.Font(font_path, 30)
         }
+        
+        # Rendered tile numbers keyed by log2 of the tile value; there are only a few distinct tiles
+        self._tile_text_cache: Dict[int, pygame.Surface] = {}
+        
+        # Rendered score box values by label as (last value, surface)
+        self._score_value_cache: Dict[str, Tuple[str, pygame.Surface]] = {}
     
     def _load_best_score(self) -> int:
         """Load the best score from file."""
@@ -480,7 +741,8 @@ class Game2048:
         self.score = 0
         self.board._initialize_board()
         self.history = GameHistory(self.config.MAX_HISTORY)
-        self.history.add_state(self.board.board, self.score)
+        self.history.add_state(self.board.bits, self.score)
+        self._dirty = True
         
         # Reset AI stuck counter
         if isinstance(self.current_player, AIPlayer):
@@ -492,13 +754,14 @@ class Game2048:
             return False
         
         # Add current state to history before making move
-        self.history.add_state(self.board.board, self.score)
+        self.history.add_state(self.board.bits, self.score)
         
         # Make the move
         score_gained, move_made = self.game_logic.make_move(direction)
         
         if move_made:
             self.score += score_gained
+            self._dirty = True
             
             # Update AI stuck counter
             if isinstance(self.current_player, AIPlayer):
@@ -525,7 +788,8 @@ class Game2048:
             return False
         
         try:
-            self.board.board, self.score = self.history.undo()
+            self.board.bits, self.score = self.history.undo()
+            self._dirty = True
             return True
         except ValueError:
             return False
@@ -539,23 +803,7 @@ class Game2048:
         """Clear the best score."""
         self.best_score = 0
         self._save_best_score()
-    
-    def get_ai_move(self) -> str:
-        """Get the next move from the AI."""
-        if self.player_type != PlayerType.COMPUTER or self.state != GameState.PLAYING:
-            return 'w'
-        
-        # If stuck too long, make random moves
-        if self.stuck_counter > 15:
-            return random.choice(['w', 'a', 's', 'd'])
-        elif self.stuck_counter > 5:
-            return random.choice(['a', 's', 'd'])  # Avoid 'w' which might be causing the issue
-        
-        try:
-            best_move, _ = self.ai.get_best_move(self.board, self.score)
-            return best_move
-        except Exception:
-            return random.choice(['w', 'a', 's', 'd'])
+        self._dirty = True
     
     def run(self) -> None:
         """Main game loop."""
@@ -575,18 +823,46 @@ class Game2048:
                 
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self._handle_mouse_event(event)
+                
+                elif event.type == pygame.VIDEOEXPOSE:
+                    self._dirty = True
             
-            # AI moves
-            if isinstance(self.current_player, AIPlayer) and self.state == GameState.PLAYING:
-                ai_move = self.current_player.get_move(self.board, self.score)
-                self.make_move(ai_move)
+            # AI moves: apply search results for as long as the per-frame budget allows
+            tick_start = time.perf_counter()
+            while isinstance(self.current_player, AIPlayer) and self.state == GameState.PLAYING:
+                if not self._search_pending:
+                    self._search_queue.put((self.board.bits, self.score))
+                    self._search_pending = True
+                
+                remaining = self.config.AI_TICK_BUDGET - (time.perf_counter() - tick_start)
+                if remaining <= 0:
+                    break
+                try:
+                    searched_bits, ai_move = self._result_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                
+                # Ignore results for a board that has changed since the search started
+                self._search_pending = False
+                if searched_bits == self.board.bits:
+                    self.make_move(ai_move)
             
-            # Render
-            self._render()
-            pygame.display.update()
+            # Render only when something changed
+            if self._dirty:
+                self._render()
+                pygame.display.update()
+                self._dirty = False
         
         pygame.quit()
     
+    def _ai_worker(self) -> None:
+        """Run AI searches in the background so the main loop stays responsive."""
+        snapshot = GameBoard(self.config.BOARD_SIZE)
+        while True:
+            snapshot.bits, score = self._search_queue.get()
+            ai_move = self.ai_player.get_move(snapshot, score)
+            self._result_queue.put((snapshot.bits, ai_move))
+    
     def _handle_key_event(self, event: pygame.event.Event) -> None:
         """Handle keyboard events."""
         if self.state != GameState.PLAYING or not isinstance(self.current_player, HumanPlayer):
@@ -647,145 +923,202 @@ class Game2048:
         if play_again_rect.collidepoint(mouse_pos):
             self.state = GameState.START_SCREEN
             self.current_player = None
+            self._dirty = True
     
-    def _render(self) -> None:
-        """Render the current game state."""
-        self.screen.fill(self.colors.WHITE)
+    def _initialize_surfaces(self) -> None:
+        """Pre-render everything that does not change between frames."""
+        self._start_screen_surface = self._build_start_screen()
+        self._game_screen_surface = self._build_game_screen()
+        self._game_over_surface = self._build_game_over_screen()
+        self._board_background = self._build_board_background()
+        self._score_box_backgrounds = {
+            label: self._build_score_box(label) for label in ("SCORE", "BEST")
+        }
         
-        if self.state == GameState.START_SCREEN:
-            self._render_start_screen()
-        elif self.state == GameState.PLAYING:
-            self._render_game()
-        elif self.state == GameState.GAME_OVER:
-            self._render_game_over()
+        # Rendered final score on the game over screen as (last score, surface)
+        self._final_score_cache: Tuple[Optional[int], Optional[pygame.Surface]] = (None, None)
     
-    def _render_start_screen(self) -> None:
-        """Render the start screen."""
-        # Semi-transparent overlay
-        overlay = pygame.Surface((self.config.DISPLAY_WIDTH, self.config.DISPLAY_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(self.colors.WHITE)
-        self.screen.blit(overlay, (0, 0))
+    def _build_screen_surface(self, overlay: bool) -> pygame.Surface:
+        """Create a blank full-screen surface, optionally with the semi-transparent overlay."""
+        surface = pygame.Surface((self.config.DISPLAY_WIDTH, self.config.DISPLAY_HEIGHT))
+        surface.fill(self.colors.WHITE)
+        
+        if overlay:
+            overlay_surface = pygame.Surface((self.config.DISPLAY_WIDTH, self.config.DISPLAY_HEIGHT))
+            overlay_surface.set_alpha(200)
+            overlay_surface.fill(self.colors.WHITE)
+            surface.blit(overlay_surface, (0, 0))
+        
+        return surface
+    
+    def _build_start_screen(self) -> pygame.Surface:
+        """Pre-render the start screen."""
+        surface = self._build_screen_surface(overlay=True)
         
         # Title
         title_text = self.fonts['title'].render("2048", True, self.colors.TITLE)
         title_rect = title_text.get_rect(center=(self.config.DISPLAY_WIDTH // 2, 100))
-        self.screen.blit(title_text, title_rect)
+        surface.blit(title_text, title_rect)
         
         # Choose player text
         choose_text = self.fonts['tile'].render("CHOOSE PLAYER", True, (0, 0, 0))
         choose_rect = choose_text.get_rect(center=(self.config.DISPLAY_WIDTH // 2, 200))
-        self.screen.blit(choose_text, choose_rect)
+        surface.blit(choose_text, choose_rect)
         
         # Player buttons
-        self._render_button("Human", 80, 327, 155, 66)
-        self._render_button("Computer", 302, 327, 218, 66)
+        self._draw_button(surface, "Human", 80, 327, 155, 66)
+        self._draw_button(surface, "Computer", 302, 327, 218, 66)
+        
+        return surface
     
-    def _render_game(self) -> None:
-        """Render the main game screen."""
+    def _build_game_screen(self) -> pygame.Surface:
+        """Pre-render the static chrome of the main game screen."""
+        surface = self._build_screen_surface(overlay=False)
+        
         # Title
         title_text = self.fonts['title'].render("2048", True, self.colors.TITLE)
-        self.screen.blit(title_text, (30, 15))
-        
-        # Score boxes
-        self._render_score_box("SCORE", str(self.score), 320, 30)
-        self._render_score_box("BEST", str(self.best_score), 450, 30)
+        surface.blit(title_text, (30, 15))
         
         # Buttons
-        self._render_button("RESET", 30, 115, 60, 30)
-        self._render_button("UNDO", 510, 115, 60, 30)
+        self._draw_button(surface, "RESET", 30, 115, 60, 30)
+        self._draw_button(surface, "UNDO", 510, 115, 60, 30)
         
         # Clear button (small square)
         clear_rect = pygame.Rect(530, 40, 15, 12)
-        pygame.draw.rect(self.screen, self.colors.SCORE_BG, clear_rect)
+        pygame.draw.rect(surface, self.colors.SCORE_BG, clear_rect)
         
-        # Game board
-        self._render_board()
+        return surface
     
-    def _render_game_over(self) -> None:
-        """Render the game over screen."""
-        # Semi-transparent overlay
-        overlay = pygame.Surface((self.config.DISPLAY_WIDTH, self.config.DISPLAY_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(self.colors.WHITE)
-        self.screen.blit(overlay, (0, 0))
+    def _build_game_over_screen(self) -> pygame.Surface:
+        """Pre-render the game over screen, except for the final score."""
+        surface = self._build_screen_surface(overlay=True)
         
         # Game over text
         game_over_text = self.fonts['tile'].render("Game Over!", True, (0, 0, 0))
         game_over_rect = game_over_text.get_rect(center=(self.config.DISPLAY_WIDTH // 2, 300))
-        self.screen.blit(game_over_text, game_over_rect)
-        
-        # Final score
-        score_text = self.fonts['final_score'].render(f"Score: {self.score}", True, (0, 0, 0))
-        score_rect = score_text.get_rect(center=(self.config.DISPLAY_WIDTH // 2, 350))
-        self.screen.blit(score_text, score_rect)
+        surface.blit(game_over_text, game_over_rect)
         
         # Play again button
-        self._render_button("PLAY AGAIN", 170, 420, 265, 66)
+        self._draw_button(surface, "PLAY AGAIN", 170, 420, 265, 66)
+        
+        return surface
     
-    def _render_board(self) -> None:
-        """Render the game board."""
+    def _build_board_background(self) -> pygame.Surface:
+        """Pre-render the empty game board background."""
         board_surface = pygame.Surface((self.config.GAME_BOX_SIZE, self.config.GAME_BOX_SIZE))
         board_surface.fill(self.colors.WHITE)
         
-        # Draw background
         pygame.draw.rect(board_surface, self.colors.BACKGROUND, 
                         (0, 0, self.config.GAME_BOX_SIZE, self.config.GAME_BOX_SIZE), 
                         border_radius=5)
         
+        return board_surface
+    
+    def _build_score_box(self, label: str) -> pygame.Surface:
+        """Pre-render a score box background with its label."""
+        box_width, box_height = 120, 60
+        box_surface = pygame.Surface((box_width, box_height))
+        box_surface.fill(self.colors.WHITE)
+        
+        # Draw background
+        pygame.draw.rect(box_surface, self.colors.SCORE_BG, 
+                        (0, 0, box_width, box_height), border_radius=5)
+        
+        # Draw label
+        label_text = self.fonts['score_label'].render(label, True, self.colors.SCORE_BG)
+        label_rect = label_text.get_rect(center=(box_width // 2, box_height // 2 - 10))
+        box_surface.blit(label_text, label_rect)
+        
+        return box_surface
+    
+    def _render(self) -> None:
+        """Render the current game state."""
+        if self.state == GameState.START_SCREEN:
+            self._render_start_screen()
+        elif self.state == GameState.PLAYING:
+            self._render_game()
+        elif self.state == GameState.GAME_OVER:
+            self._render_game_over()
+    
+    def _render_start_screen(self) -> None:
+        """Render the start screen."""
+        self.screen.blit(self._start_screen_surface, (0, 0))
+    
+    def _render_game(self) -> None:
+        """Render the main game screen."""
+        # Title, buttons and clear button
+        self.screen.blit(self._game_screen_surface, (0, 0))
+        
+        # Score boxes
+        self._render_score_box("SCORE", str(self.score), 320, 30)
+        self._render_score_box("BEST", str(self.best_score), 450, 30)
+        
+        # Game board
+        self._render_board()
+    
+    def _render_game_over(self) -> None:
+        """Render the game over screen."""
+        self.screen.blit(self._game_over_surface, (0, 0))
+        
+        # Final score, re-rendered only when it changed
+        cached_score, score_text = self._final_score_cache
+        if cached_score != self.score:
+            score_text = self.fonts['final_score'].render(f"Score: {self.score}", True, (0, 0, 0))
+            self._final_score_cache = (self.score, score_text)
+        score_rect = score_text.get_rect(center=(self.config.DISPLAY_WIDTH // 2, 350))
+        self.screen.blit(score_text, score_rect)
+    
+    def _render_board(self) -> None:
+        """Render the game board."""
+        board_x = (self.config.DISPLAY_WIDTH - self.config.GAME_BOX_SIZE) // 2
+        board_y = self.config.DISPLAY_HEIGHT - self.config.GAME_BOX_SIZE - 30
+        
+        # Draw background
+        self.screen.blit(self._board_background, (board_x, board_y))
+        
         # Draw tiles
         for i in range(self.config.BOARD_SIZE):
             for j in range(self.config.BOARD_SIZE):
                 index = i * self.config.BOARD_SIZE + j
-                value = self.board.board[index]
+                exponent = self.board.get_exponent(index)
                 
                 # Calculate position
-                x = self.config.MARGIN + (self.config.MARGIN + self.config.TILE_SIZE) * j
-                y = self.config.MARGIN + (self.config.MARGIN + self.config.TILE_SIZE) * i
+                x = board_x + self.config.MARGIN + (self.config.MARGIN + self.config.TILE_SIZE) * j
+                y = board_y + self.config.MARGIN + (self.config.MARGIN + self.config.TILE_SIZE) * i
                 
                 # Draw tile background
-                color = self.colors.TILE_COLORS.get(value, self.colors.TILE_COLORS[0])
-                pygame.draw.rect(board_surface, color, 
+                color = TILE_COLORS[exponent]
+                pygame.draw.rect(self.screen, color, 
                                (x, y, self.config.TILE_SIZE, self.config.TILE_SIZE), 
                                border_radius=10)
                 
                 # Draw tile text
-                if value > 0:
-                    text_color = self.colors.TEXT_COLORS.get(value, self.colors.TEXT_COLORS[0])
-                    text = self.fonts['tile'].render(str(value), True, text_color)
+                if exponent:
+                    text = self._tile_text_cache.get(exponent)
+                    if text is None:
+                        text = self.fonts['tile'].render(str(1 << exponent), True, TEXT_COLORS[exponent])
+                        self._tile_text_cache[exponent] = text
                     text_rect = text.get_rect(center=(x + self.config.TILE_SIZE // 2, 
                                                     y + self.config.TILE_SIZE // 2))
-                    board_surface.blit(text, text_rect)
-        
-        # Position board on screen
-        board_x = (self.config.DISPLAY_WIDTH - self.config.GAME_BOX_SIZE) // 2
-        board_y = self.config.DISPLAY_HEIGHT - self.config.GAME_BOX_SIZE - 30
-        self.screen.blit(board_surface, (board_x, board_y))
+                    self.screen.blit(text, text_rect)
     
     def _render_score_box(self, label: str, value: str, x: int, y: int) -> None:
         """Render a score box."""
         box_width, box_height = 120, 60
-        box_surface = pygame.Surface((box_width, box_height))
-        box_surface.fill(self.colors.WHITE)
-        
-        # Draw background
-        pygame.draw.rect(box_surface, self.colors.SCORE_BG, 
-                        (0, 0, box_width, box_height), border_radius=5)
-        
-        # Draw label
-        label_text = self.fonts['score_label'].render(label, True, self.colors.SCORE_BG)
-        label_rect = label_text.get_rect(center=(box_width // 2, box_height // 2 - 10))
-        box_surface.blit(label_text, label_rect)
         
-        # Draw value
-        value_text = self.fonts['score_value'].render(value, True, self.colors.WHITE)
-        value_rect = value_text.get_rect(center=(box_width // 2, box_height // 2 + 10))
-        box_surface.blit(value_text, value_rect)
+        # Draw background and label
+        self.screen.blit(self._score_box_backgrounds[label], (x, y))
         
-        self.screen.blit(box_surface, (x, y))
+        # Draw value, re-rendering only when it changed since the last frame
+        cached_value, value_text = self._score_value_cache.get(label, (None, None))
+        if cached_value != value:
+            value_text = self.fonts['score_value'].render(value, True, self.colors.WHITE)
+            self._score_value_cache[label] = (value, value_text)
+        value_rect = value_text.get_rect(center=(x + box_width // 2, y + box_height // 2 + 10))
+        self.screen.blit(value_text, value_rect)
     
-    def _render_button(self, text: str, x: int, y: int, width: int, height: int) -> None:
-        """Render a button."""
+    def _draw_button(self, surface: pygame.Surface, text: str, x: int, y: int, width: int, height: int) -> None:
+        """Draw a button onto a surface."""
         button_surface = pygame.Surface((width, height))
         button_surface.fill(self.colors.WHITE)
         
@@ -794,7 +1127,7 @@ class Game2048:
         text_rect = text_surface.get_rect(center=(width // 2, height // 2))
         button_surface.blit(text_surface, text_rect)
         
-        self.screen.blit(button_surface, (x, y))
+        surface.blit(button_surface, (x, y))
 
 
 def main():